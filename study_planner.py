@@ -1,34 +1,229 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import streamlit.components.v1 as components
 import datetime
+import html
+import re
+import threading
+from urllib.parse import parse_qs, urlparse
+from collections import Counter
 from io import BytesIO
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="StudyOS: Student Planner", page_icon="🎓", layout="wide")
 
-# --- SESSION STATE (The "Database") ---
-# This keeps your data alive while the app is running
-if 'tasks' not in st.session_state:
-    st.session_state['tasks'] = []
-if 'resources' not in st.session_state:
-    st.session_state['resources'] = []  # Stores links and file info
+# --- SHARED STORE (The "Database") ---
+# This keeps your data alive while the app is running. st.cache_resource hands
+# every session the same dict, so the cached views below are shared as well;
+# writes must hold store['lock'] since sessions run on separate threads.
+TASK_COLUMNS = ["Subject", "Chapter", "Topic", "Due Date", "Priority", "Status"]
+TEXT_COLUMNS = ["Subject", "Chapter", "Topic", "Priority"]
+STATUS_OPTIONS = ["Pending", "In Progress", "Done"]
+
+@st.cache_resource
+def _store():
+    return {
+        # Tasks are stored column-wise (one list per column) so building a
+        # DataFrame wraps the lists instead of unpacking a dict per row
+        'tasks': {col: [] for col in TASK_COLUMNS},
+        'resources_idx': {},  # (Subject, Type) -> list of saved links/videos
+        # Tasks per subject, updated on write. Subjects are dropped when their
+        # count reaches zero, so the keys double as the ordered subject list.
+        'subject_counter': Counter(),
+        'status_counter': Counter(),  # Tasks per status, updated on write
+        'version': 0,  # Bumped on every change to 'tasks'
+        'lock': threading.Lock(),
+    }
+
+store = _store()
 
 # --- SIDEBAR: NAVIGATION & INPUTS ---
 st.sidebar.title("🎓 StudyOS")
 page = st.sidebar.radio("Go to:", ["Dashboard", "Task Planner", "Resource Hub"])
 
-# Helper function to get subjects currently in use
+# Helper function to get subjects currently in use, in the order they were first
+# added. This relies on the task writes only adding/removing a subject_counter
+# key when a subject gains its first task or loses its last one.
 def get_subjects():
-    if not st.session_state['tasks']:
-        return ["Math", "Physics", "History", "Biology"] # Defaults
-    return list(set([t['Subject'] for t in st.session_state['tasks']]))
+    with store['lock']:
+        return list(store['subject_counter']) or ["Math", "Physics", "History", "Biology"] # Defaults
+
+# --- CACHED VIEWS ---
+# pandas/plotly are imported where they are used so pages that need neither
+# (e.g. the Resource Hub) don't pay for loading them; sys.modules makes
+# repeated imports free.
+# Streamlit reruns the whole script on every widget event, so derived data is
+# cached on the store version. The underscore-prefixed argument is skipped by
+# Streamlit's hasher (so the O(1) int is all that gets hashed, with no need
+# for hash_funcs); the version bump is what invalidates it.
+@st.cache_data(show_spinner=False, max_entries=32)
+def _tasks_df(_tasks, version):
+    import pandas as pd
+    with store['lock']:  # Columns must not grow mid-build
+        # Arrow-backed text columns go to the frontend without an object->Arrow pass
+        df = pd.DataFrame({
+            col: pd.array(values, dtype="string[pyarrow]") if col in TEXT_COLUMNS else values
+            for col, values in _tasks.items()
+        }, copy=False)
+    # Categorical status: filtering compares int8 codes instead of strings
+    df['Status'] = pd.Categorical(df['Status'], categories=STATUS_OPTIONS)
+    return df
+
+# Figures are cached as resources: they are handed back as-is instead of being
+# pickled and copied on every hit like cache_data results. They are keyed on the
+# counts themselves rather than the store version, so an edit that leaves the
+# distribution unchanged (or any session with the same counts) reuses them.
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _fig_bar(counts):
+    import pandas as pd
+    import plotly.express as px
+    # Largest first, matching value_counts() order
+    rows = sorted(counts, key=lambda item: -item[1])
+    subj_counts = pd.DataFrame(rows, columns=['Subject', 'Count'])
+    return px.bar(subj_counts, x='Subject', y='Count', color='Subject', template="plotly_white")
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _fig_pie(counts):
+    import pandas as pd
+    import plotly.express as px
+    rows = sorted(counts, key=lambda item: -item[1])
+    status_counts = pd.DataFrame(rows, columns=['Status', 'Count'])
+    return px.pie(status_counts, values='Count', names='Status', hole=0.4)
+
+# Uploaded file bytes, read once per upload. Bytes are immutable, so a resource
+# cache can hand back the same object instead of a pickled copy per rerun.
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _read_upload(file_id, name, size, _upload):
+    return _upload.getvalue()  # getvalue() doesn't consume the stream like read()
+
+# Embeddable form of a YouTube watch/short/youtu.be link, or None for any other
+# URL (those are played through st.video instead of an iframe)
+def _to_embed(url):
+    parsed = urlparse(url)
+    host = parsed.netloc.lower().removeprefix("www.").removeprefix("m.")
+    video_id = None
+    if host == "youtu.be":
+        video_id = parsed.path.lstrip("/")
+    elif host == "youtube.com":
+        if parsed.path == "/watch":
+            video_id = parse_qs(parsed.query).get("v", [None])[0]
+        elif parsed.path.startswith(("/shorts/", "/embed/")):
+            video_id = parsed.path.split("/")[2]
+    if video_id and re.fullmatch(r"[A-Za-z0-9_-]+", video_id):
+        return f"https://www.youtube.com/embed/{video_id}"
+    return None
+
+# A subject's YouTube videos as one HTML block, so the page mounts a single
+# component instead of one st.video per saved URL. Iframes load lazily. Only
+# URLs produced by _to_embed go in here.
+@st.cache_data(show_spinner=False, max_entries=32)
+def _videos_html(embed_urls):
+    frames = "".join(
+        f'<iframe src="{html.escape(url)}" width="480" height="270" loading="lazy" '
+        'frameborder="0" allowfullscreen></iframe>'
+        for url in embed_urls
+    )
+    return f'<div style="display:flex;flex-wrap:wrap;gap:12px">{frames}</div>'
+
+# Content-addressed key for the figures above, built from one of the counters
+def counts_key(name):
+    with store['lock']:
+        # Unary + drops entries whose count fell to zero
+        return tuple(sorted((+store[name]).items()))
+
+# --- TASK WRITES ---
+# Callers hold store['lock'] and bump store['version'] once they are done.
+# Counters are adjusted here so they stay in step with the task columns without
+# ever rescanning them.
+def _count_task(subject, status, delta):
+    if subject:
+        store['subject_counter'][subject] += delta
+        if store['subject_counter'][subject] <= 0:
+            del store['subject_counter'][subject]
+    if status:
+        store['status_counter'][status] += delta
+
+def _append_task(task):
+    for col in TASK_COLUMNS:
+        store['tasks'][col].append(task.get(col))
+    _count_task(task.get('Subject'), task.get('Status'), 1)
+
+def _edit_task(row, patch):
+    tasks = store['tasks']
+    old_subject, old_status = tasks['Subject'][row], tasks['Status'][row]
+    for col, value in patch.items():
+        if col in tasks:
+            tasks[col][row] = _editor_value(col, value)
+    # Only touch a counter when its value changed: removing and re-adding a
+    # subject's last task would move it to the end of the subject order
+    new_subject, new_status = tasks['Subject'][row], tasks['Status'][row]
+    if new_subject != old_subject:
+        _count_task(old_subject, None, -1)
+        _count_task(new_subject, None, 1)
+    if new_status != old_status:
+        _count_task(None, old_status, -1)
+        _count_task(None, new_status, 1)
+
+def _delete_task(row):
+    tasks = store['tasks']
+    _count_task(tasks['Subject'][row], tasks['Status'][row], -1)
+    for col in TASK_COLUMNS:
+        del tasks[col][row]
+
+def _editor_value(col, value):
+    # st.data_editor reports edited dates as ISO strings
+    if col == "Due Date" and isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    return value
+
+# on_change callback for the task table: applies only the editor's delta.
+# positions maps the displayed (possibly filtered) rows back to store rows.
+def sync_task_edits(editor_key, positions, version):
+    delta = st.session_state[editor_key]
+    with store['lock']:
+        if store['version'] != version:
+            st.warning("Tasks were changed in another session, so your last table edit was discarded.")
+            return
+        for i, patch in delta['edited_rows'].items():
+            _edit_task(positions[int(i)], patch)
+        # Highest rows first so earlier positions stay valid
+        for i in sorted(delta['deleted_rows'], reverse=True):
+            _delete_task(positions[i])
+        for added in delta['added_rows']:
+            task = {col: _editor_value(col, value) for col, value in added.items() if col in TASK_COLUMNS}
+            task['Status'] = task.get('Status') or "Pending"
+            _append_task(task)
+        store['version'] += 1
+
+# --- DASHBOARD BLOCKS ---
+def _kpi_row():
+    # KPIs come straight from the status column; no DataFrame needed for scalars
+    statuses = store['tasks']['Status']
+    total_tasks = len(statuses)
+    completed = statuses.count('Done')
+    pending = total_tasks - completed
+    completion_rate = int((completed / total_tasks) * 100) if total_tasks > 0 else 0
+    
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Completion Rate", f"{completion_rate}%")
+    c2.metric("Pending Tasks", pending)
+    c3.metric("Completed Chapters", completed)
+
+def _subject_chart():
+    st.subheader("Progress by Subject")
+    # Count tasks per subject
+    fig_bar = _fig_bar(counts_key('subject_counter'))
+    st.plotly_chart(fig_bar, use_container_width=True)
+
+def _status_chart():
+    st.subheader("Task Status")
+    fig_pie = _fig_pie(counts_key('status_counter'))
+    st.plotly_chart(fig_pie, use_container_width=True)
 
 # --- PAGE 1: DASHBOARD (The Overview) ---
-if page == "Dashboard":
+def render_dashboard():
     st.title("📊 Study Overview")
     
-    if not st.session_state['tasks']:
+    if not store['tasks']['Subject']:
         st.info("👋 Welcome! Go to the 'Task Planner' tab to add your first study goal.")
         
         # --- DEMO DATA FOR VISUALIZATION ---
@@ -40,19 +235,7 @@ if page == "Dashboard":
         col3.metric("Next Exam", "2 Days", "Math")
     else:
         # REAL DATA COMPUTATION
-        df = pd.DataFrame(st.session_state['tasks'])
-        
-        # KPIs
-        total_tasks = len(df)
-        completed = len(df[df['Status'] == 'Done'])
-        pending = total_tasks - completed
-        completion_rate = int((completed / total_tasks) * 100) if total_tasks > 0 else 0
-        
-        # KPI Row
-        c1, c2, c3 = st.columns(3)
-        c1.metric("Completion Rate", f"{completion_rate}%")
-        c2.metric("Pending Tasks", pending)
-        c3.metric("Completed Chapters", completed)
+        _kpi_row()
         
         st.divider()
         
@@ -60,91 +243,92 @@ if page == "Dashboard":
         c_left, c_right = st.columns(2)
         
         with c_left:
-            st.subheader("Progress by Subject")
-            # Count tasks per subject
-            subj_counts = df['Subject'].value_counts().reset_index()
-            subj_counts.columns = ['Subject', 'Count']
-            fig_bar = px.bar(subj_counts, x='Subject', y='Count', color='Subject', template="plotly_white")
-            st.plotly_chart(fig_bar, use_container_width=True)
+            _subject_chart()
             
         with c_right:
-            st.subheader("Task Status")
-            status_counts = df['Status'].value_counts().reset_index()
-            status_counts.columns = ['Status', 'Count']
-            fig_pie = px.pie(status_counts, values='Count', names='Status', hole=0.4)
-            st.plotly_chart(fig_pie, use_container_width=True)
+            _status_chart()
 
 # --- PAGE 2: TASK PLANNER (Calendar & To-Do) ---
-elif page == "Task Planner":
+def render_planner():
+    import numpy as np
     st.title("📅 Study Schedule")
     
     # 1. ADD NEW TASK FORM
     with st.expander("➕ Add New Study Task", expanded=True):
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            subject = st.text_input("Subject (e.g., Physics)")
-        with c2:
-            chapter = st.text_input("Chapter (e.g., Thermodynamics)")
-        with c3:
-            topic = st.text_input("Topic (e.g., Heat Transfer)")
+        # A form batches the inputs so typing does not rerun the script per keystroke
+        with st.form("add_task", clear_on_submit=True):
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                subject = st.text_input("Subject (e.g., Physics)")
+            with c2:
+                chapter = st.text_input("Chapter (e.g., Thermodynamics)")
+            with c3:
+                topic = st.text_input("Topic (e.g., Heat Transfer)")
             
-        c4, c5 = st.columns(2)
-        with c4:
-            due_date = st.date_input("Due Date", datetime.date.today())
-        with c5:
-            priority = st.selectbox("Priority", ["High", "Medium", "Low"])
+            c4, c5 = st.columns(2)
+            with c4:
+                due_date = st.date_input("Due Date", datetime.date.today())
+            with c5:
+                priority = st.selectbox("Priority", ["High", "Medium", "Low"])
             
-        if st.button("Add Task"):
-            if subject and chapter:
-                st.session_state['tasks'].append({
-                    "Subject": subject,
-                    "Chapter": chapter,
-                    "Topic": topic,
-                    "Due Date": due_date,
-                    "Priority": priority,
-                    "Status": "Pending"
-                })
-                st.success("Task Added!")
-                st.rerun()
-            else:
-                st.error("Please fill in at least Subject and Chapter.")
+            if st.form_submit_button("Add Task"):
+                if subject and chapter:
+                    new_task = {
+                        "Subject": subject,
+                        "Chapter": chapter,
+                        "Topic": topic,
+                        "Due Date": due_date,
+                        "Priority": priority,
+                        "Status": "Pending"
+                    }
+                    with store['lock']:
+                        _append_task(new_task)
+                        store['version'] += 1
+                    st.success("Task Added!")
+                else:
+                    st.error("Please fill in at least Subject and Chapter.")
 
     # 2. VIEW TASKS
     st.divider()
     st.subheader("Your To-Do List")
     
-    if st.session_state['tasks']:
-        df_tasks = pd.DataFrame(st.session_state['tasks'])
+    if store['tasks']['Subject']:
+        version = store['version']
+        df_tasks = _tasks_df(store['tasks'], version)
         
         # Simple Filter
         filter_status = st.selectbox("Filter by Status:", ["All", "Pending", "Done"])
         if filter_status != "All":
-            df_tasks = df_tasks[df_tasks['Status'] == filter_status]
+            code = df_tasks['Status'].cat.categories.get_loc(filter_status)
+            df_tasks = df_tasks.iloc[np.flatnonzero(df_tasks['Status'].cat.codes.to_numpy() == code)]
             
         # Display as an interactive editor
         # Users can check boxes or change status directly in the table!
-        edited_df = st.data_editor(
+        # Edits are written back as a delta by sync_task_edits; the key changes
+        # with the version so the editor starts clean once they are applied.
+        editor_key = f"tasks_editor_{filter_status}_{version}"
+        st.data_editor(
             df_tasks,
             column_config={
                 "Status": st.column_config.SelectboxColumn(
                     "Status",
                     help="Update status",
                     width="medium",
-                    options=["Pending", "In Progress", "Done"],
+                    options=STATUS_OPTIONS,
                     required=True,
                 ),
                 "Due Date": st.column_config.DateColumn("Due Date")
             },
-            num_rows="dynamic"
+            num_rows="dynamic",
+            key=editor_key,
+            on_change=sync_task_edits,
+            args=(editor_key, df_tasks.index.tolist(), version),
         )
-        
-        # Sync changes back to session state (Optional advanced feature)
-        # For simplicity, we just display the editable table for now.
     else:
         st.info("No tasks yet. Add one above!")
 
 # --- PAGE 3: RESOURCE HUB (PDFs, Links, Videos) ---
-elif page == "Resource Hub":
+def render_resources():
     st.title("📚 Digital Library")
     
     # Organize by Subject
@@ -159,38 +343,51 @@ elif page == "Resource Hub":
     
     with tab1:
         st.subheader("Save Website Links")
-        link_url = st.text_input("Paste URL:")
-        link_desc = st.text_input("Description (e.g., Wikipedia Article):")
-        if st.button("Save Link"):
-            st.session_state['resources'].append({
-                "Subject": selected_subject,
-                "Type": "Link",
-                "Content": link_url,
-                "Desc": link_desc
-            })
-            st.success("Link Saved!")
+        with st.form("add_link", clear_on_submit=True):
+            link_url = st.text_input("Paste URL:")
+            link_desc = st.text_input("Description (e.g., Wikipedia Article):")
+            if st.form_submit_button("Save Link"):
+                with store['lock']:
+                    store['resources_idx'].setdefault((selected_subject, "Link"), []).append({
+                        "Subject": selected_subject,
+                        "Type": "Link",
+                        "Content": link_url,
+                        "Desc": link_desc
+                    })
+                st.success("Link Saved!")
             
         # Display Links
         st.write("---")
-        for res in st.session_state['resources']:
-            if res['Type'] == "Link" and res['Subject'] == selected_subject:
-                st.markdown(f"🔗 **[{res['Desc']}]({res['Content']})**")
+        for res in store['resources_idx'].get((selected_subject, "Link"), []):
+            st.markdown(f"🔗 **[{res['Desc']}]({res['Content']})**")
 
     with tab2:
         st.subheader("Embed Educational Videos")
-        video_url = st.text_input("Paste YouTube URL:")
-        if st.button("Add Video"):
-             st.session_state['resources'].append({
-                "Subject": selected_subject,
-                "Type": "Video",
-                "Content": video_url
-            })
+        with st.form("add_video", clear_on_submit=True):
+            video_url = st.text_input("Paste YouTube URL:")
+            if st.form_submit_button("Add Video"):
+                parsed = urlparse(video_url.strip())
+                if parsed.scheme in ("http", "https") and parsed.netloc:
+                    with store['lock']:
+                        store['resources_idx'].setdefault((selected_subject, "Video"), []).append({
+                            "Subject": selected_subject,
+                            "Type": "Video",
+                            "Content": video_url.strip()
+                        })
+                else:
+                    st.error("Please paste a valid http(s) video URL.")
         
         # Display Videos
         st.write("---")
-        for res in st.session_state['resources']:
-            if res['Type'] == "Video" and res['Subject'] == selected_subject:
-                st.video(res['Content'])
+        embeds = []
+        for res in store['resources_idx'].get((selected_subject, "Video"), []):
+            embed = _to_embed(res['Content'])
+            if embed:
+                embeds.append(embed)
+            else:
+                st.video(res['Content'])  # Vimeo, direct .mp4, ...
+        if embeds:
+            components.html(_videos_html(tuple(embeds)), height=min(290 * len(embeds), 600), scrolling=True)
 
     with tab3:
         st.subheader("Upload Study Material")
@@ -200,18 +397,27 @@ elif page == "Resource Hub":
             # In a real app, you save this to disk. 
             # Here we just show it immediately for the session.
             st.write(f"**Previewing: {uploaded_file.name}**")
+            raw = _read_upload(uploaded_file.file_id, uploaded_file.name, uploaded_file.size, uploaded_file)
             
             if uploaded_file.type == "application/pdf":
                 # PDF Display is tricky in browsers, we provide a download button usually
                 # or use an iframe. Simplest is to let them download it back.
                 st.download_button(
                     label="Download PDF",
-                    data=uploaded_file,
+                    data=raw,
                     file_name=uploaded_file.name,
                     mime='application/pdf',
                 )
             else:
-                st.image(uploaded_file)
+                st.image(raw)
+
+# --- PAGE DISPATCH ---
+PAGES = {
+    "Dashboard": render_dashboard,
+    "Task Planner": render_planner,
+    "Resource Hub": render_resources,
+}
+PAGES[page]()
 
 # --- FOOTER ---
 st.sidebar.markdown("---")